@@ -80,6 +80,16 @@ def test_search_same_origin_destination_returns_empty_list(client: TestClient):
     assert r.status_code == 200
     assert r.json() == []
 
+def test_search_repeated_query_returns_same_payload(client: TestClient):
+    # Second call hits the in-process result cache; payload must be identical
+    params = {"origin": "JFK", "destination": "LAX", "date": "2024-03-15"}
+    first = client.get("/search", params=params)
+    second = client.get("/search", params=params)
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json() == second.json()
+
+
 def test_search_sfo_to_nrt_returns_results(client: TestClient):
     # Instruction test case: international route
     r = client.get("/search", params={"origin": "SFO", "destination": "NRT", "date": "2024-03-15"})